@@ -1,18 +1,234 @@
 #!/usr/bin/env python3
 import os
 import re
+import functools
 import sys
+import shutil
 import subprocess
 import json
 import base64
 import tempfile
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-import requests
-from github import Github, Repository, ContentFile
-import markdown
-from bs4 import BeautifulSoup
-import inquirer
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Optional, Any
+
+# Keywords to look for various tools and technologies
+_TOOL_PATTERNS = {
+    "java": r"\bjava\b|\bjdk\b|\bjre\b",
+    "maven": r"\bmaven\b|\bmvn\b",
+    "gradle": r"\bgradle\b",
+    "node": r"\bnode(?:js)?\b",
+    "npm": r"\bnpm\b",
+    "python3": r"\bpython(?:3)?\b|\bpip(?:3)?\b",
+    "docker": r"\bdocker\b",
+    "docker-compose": r"\bdocker[ -]compose\b",
+    "git": r"\bgit\b",
+    "mongodb": r"\bmongo(?:db)?\b",
+    "postgresql": r"\bpostgre(?:s|sql)?\b",
+    "mysql": r"\bmysql\b",
+    "redis": r"\bredis\b",
+    "vscode": r"\bvs ?code\b|\bvisual studio code\b",
+    "intellij-idea": r"\bintellij\b|\bidea\b"
+}
+
+# Substrings that must appear (case-insensitively) before a tool's pattern can match
+_TOOL_KEYWORDS = {
+    "java": ("java", "jdk", "jre"),
+    "maven": ("maven", "mvn"),
+    "gradle": ("gradle",),
+    "node": ("node",),
+    "npm": ("npm",),
+    "python3": ("python", "pip"),
+    "docker": ("docker",),
+    "docker-compose": ("compose",),
+    "git": ("git",),
+    "mongodb": ("mongo",),
+    "postgresql": ("postgre",),
+    "mysql": ("mysql",),
+    "redis": ("redis",),
+    "vscode": ("code",),
+    "intellij-idea": ("intellij", "idea")
+}
+
+# Patterns are combined into one alternation of named groups so a README is
+# scanned only once. docker-compose goes first so it wins over plain docker.
+_TOOL_GROUPS = {
+    tool.replace("-", "_"): tool
+    for tool in ["docker-compose"] + [t for t in _TOOL_PATTERNS if t != "docker-compose"]
+}
+
+@functools.lru_cache(maxsize=None)
+def _tool_regex(groups: tuple) -> "re.Pattern":
+    """Compile the combined detection regex for the given tool groups."""
+    return re.compile(
+        "|".join(f"(?P<{group}>{_TOOL_PATTERNS[_TOOL_GROUPS[group]]})" for group in groups),
+        re.IGNORECASE
+    )
+
+@functools.lru_cache(maxsize=256)
+def _detect_tools(readme_content: str) -> tuple:
+    """Detect the tools mentioned in a README; cached since READMEs are re-analyzed often."""
+    # Only run the regex for tools whose keywords appear somewhere in the README
+    lowered = readme_content.lower()
+    active = tuple(
+        group for group, tool in _TOOL_GROUPS.items()
+        if any(keyword in lowered for keyword in _TOOL_KEYWORDS[tool])
+    )
+    if not active:
+        return ()
+    
+    found = {_TOOL_GROUPS[match.lastgroup] for match in _tool_regex(active).finditer(readme_content)}
+    
+    # "docker compose" is consumed by the docker-compose alternative, but it
+    # also mentions docker on its own
+    if "docker-compose" in found:
+        found.add("docker")
+    
+    return tuple(tool for tool in _TOOL_PATTERNS if tool in found)
+
+_HEADING_TAGS = {"h1", "h2", "h3", "h4"}
+
+# Heading keywords in priority order, mapped to the setup_info bucket they select
+_HEADING_KEYWORDS = [
+    ("prerequisite", "prerequisites"),
+    ("requirement", "prerequisites"),
+    ("depend", "prerequisites"),
+    ("tool", "prerequisites"),
+    ("software", "prerequisites"),
+    ("setup", "environment_setup"),
+    ("install", "environment_setup"),
+    ("configur", "environment_setup"),
+    ("environ", "environment_setup"),
+    ("database", "database_setup"),
+    ("db", "database_setup"),
+    ("data", "database_setup"),
+    ("run", "running_instructions"),
+    ("start", "running_instructions"),
+    ("execute", "running_instructions"),
+    ("ide", "ide_setup"),
+    ("intellij", "ide_setup"),
+    ("eclipse", "ide_setup"),
+    ("vscode", "ide_setup"),
+    ("editor", "ide_setup")
+]
+
+@functools.lru_cache(maxsize=None)
+def _markdown_parser():
+    """Create the shared markdown parser, importing markdown-it on first use."""
+    from markdown_it import MarkdownIt
+    return MarkdownIt()
+
+def _inline_text(token) -> str:
+    """Return the plain text of an inline token, dropping markup."""
+    parts = []
+    for child in token.children or []:
+        if child.type in ("text", "code_inline"):
+            parts.append(child.content)
+        elif child.type in ("softbreak", "hardbreak"):
+            parts.append("\n")
+    return "".join(parts)
+
+def _bullet_list_items(tokens, start: int) -> List[str]:
+    """Return the text of every item, nested ones included, of the list opened at tokens[start]."""
+    items = []
+    open_items = []
+    for token in tokens[start + 1:]:
+        if token.type == "bullet_list_close" and token.level == tokens[start].level:
+            break
+        if token.type == "list_item_open":
+            open_items.append(len(items))
+            items.append([])
+        elif token.type == "list_item_close":
+            open_items.pop()
+        elif token.type == "inline":
+            # An item's text includes the text of any items nested inside it
+            for index in open_items:
+                items[index].append(_inline_text(token))
+    return ["\n".join(parts).strip() for parts in items]
+
+def _paragraph_text(tokens, start: int) -> List[str]:
+    """Return the text of the paragraph opened at tokens[start]."""
+    return [_inline_text(tokens[start + 1]).strip()]
+
+def _code_text(tokens, start: int) -> List[str]:
+    """Return the content of the code block at tokens[start]."""
+    return [tokens[start].content.strip()]
+
+# Top-level block tokens collected for a section, mapped to the function extracting their text
+_TEXT_ACTIONS = {
+    "paragraph_open": _paragraph_text,
+    "bullet_list_open": _bullet_list_items
+}
+_TEXT_AND_CODE_ACTIONS = {
+    **_TEXT_ACTIONS,
+    "fence": _code_text,
+    "code_block": _code_text
+}
+
+# Block actions used for each bucket (prerequisites skip code blocks)
+_SECTION_ACTIONS = {
+    "prerequisites": _TEXT_ACTIONS,
+    "environment_setup": _TEXT_AND_CODE_ACTIONS,
+    "database_setup": _TEXT_AND_CODE_ACTIONS,
+    "running_instructions": _TEXT_AND_CODE_ACTIONS,
+    "ide_setup": _TEXT_AND_CODE_ACTIONS
+}
+
+_GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Seconds to wait for a GraphQL response, matching PyGithub's default timeout
+_GITHUB_TIMEOUT = 15
+
+# Names and types of the root-level entries of the default branch
+_ROOT_ENTRIES_QUERY = """
+query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    object(expression: "HEAD:") {
+      ... on Tree {
+        entries {
+          name
+          type
+        }
+      }
+    }
+  }
+}
+"""
+
+def _readmes_query(count: int) -> str:
+    """Build a query returning the blob at each expression $p0..$p<count-1> under aliases p0.., or null."""
+    variables = "".join(f", $p{index}: String!" for index in range(count))
+    fields = "".join(
+        f"    p{index}: object(expression: $p{index}) {{ ... on Blob {{ oid text isTruncated }} }}\n"
+        for index in range(count)
+    )
+    return (
+        f"query($owner: String!, $name: String!{variables}) {{\n"
+        f"  repository(owner: $owner, name: $name) {{\n{fields}  }}\n"
+        "}\n"
+    )
+
+@dataclass
+class Project:
+    """
+    A project directory in the repository.
+    
+    If the README.md text wasn't returned during discovery, it is only downloaded
+    and decoded when its content is first accessed.
+    """
+    name: str
+    path: str
+    readme_sha: str
+    fetch_readme: Callable[[str], Optional[str]] = field(repr=False)
+    readme_text: Optional[str] = field(default=None, repr=False)
+    
+    @property
+    def readme_content(self) -> Optional[str]:
+        """Decoded content of the project's README.md file, or None if it couldn't be fetched."""
+        if self.readme_text is None:
+            self.readme_text = self.fetch_readme(self.readme_sha)
+        return self.readme_text
 
 class EnvironmentSetupAgent:
     """
@@ -28,28 +244,41 @@ class EnvironmentSetupAgent:
             github_token: Personal access token for GitHub
             repo_name: Full name of the repository (e.g., "organization/repo")
         """
+        from github import Github
+        
         self.github_token = github_token
         self.repo_name = repo_name
+        self.enable_http_cache()
         self.github_client = Github(github_token)
         self.repo = self.github_client.get_repo(repo_name)
         self.projects = []
+        # Tool name -> installed status from the most recent verification this session
+        self._installed_cache = {}
+        # README blob SHA -> parsed README setup information. The SHA is a digest of the
+        # content, so entries stay valid across rediscovery and identical READMEs share one
+        self._parse_cache = {}
+        # Tools listing "apt" packages get them from one batched apt-get run, after any
+        # "apt_sources" commands have added their repositories; "installation" holds the
+        # remaining shell steps, run after the tool's apt packages are in place
         self.tools_cache = {
             "general": {
                 "git": {
-                    "installation": "sudo apt-get update && sudo apt-get install -y git",
+                    "apt": ["git"],
                     "verification": "git --version",
+                    "which": ["git"],
                 },
                 "docker": {
-                    "installation": """
-                        sudo apt-get update
-                        sudo apt-get install -y apt-transport-https ca-certificates curl software-properties-common
-                        curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo apt-key add -
-                        sudo add-apt-repository "deb [arch=amd64] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable"
-                        sudo apt-get update
-                        sudo apt-get install -y docker-ce docker-ce-cli containerd.io
-                        sudo usermod -aG docker $USER
-                    """,
+                    "apt_sources": {
+                        "requires": ["apt-transport-https", "ca-certificates", "curl", "software-properties-common"],
+                        "commands": [
+                            "curl -fsSL https://download.docker.com/linux/ubuntu/gpg | sudo apt-key add -",
+                            'sudo add-apt-repository "deb [arch=amd64] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable"',
+                        ],
+                    },
+                    "apt": ["docker-ce", "docker-ce-cli", "containerd.io"],
+                    "installation": "sudo usermod -aG docker $USER",
                     "verification": "docker --version",
+                    "which": ["docker"],
                 },
                 "docker-compose": {
                     "installation": """
@@ -57,6 +286,7 @@ class EnvironmentSetupAgent:
                         sudo chmod +x /usr/local/bin/docker-compose
                     """,
                     "verification": "docker-compose --version",
+                    "which": ["docker-compose"],
                 },
                 "nvm": {
                     "installation": """
@@ -69,20 +299,24 @@ class EnvironmentSetupAgent:
                 "node": {
                     "installation": "nvm install --lts",
                     "verification": "node --version",
+                    "which": ["node"],
                     "dependencies": ["nvm"]
                 },
                 "npm": {
                     "installation": "", # Comes with Node.js
                     "verification": "npm --version",
+                    "which": ["npm"],
                     "dependencies": ["node"]
                 },
                 "java": {
-                    "installation": "sudo apt-get update && sudo apt-get install -y openjdk-17-jdk",
+                    "apt": ["openjdk-17-jdk"],
                     "verification": "java -version",
+                    "which": ["java"],
                 },
                 "maven": {
-                    "installation": "sudo apt-get update && sudo apt-get install -y maven",
+                    "apt": ["maven"],
                     "verification": "mvn -version",
+                    "which": ["mvn"],
                 },
                 "gradle": {
                     "installation": """
@@ -92,60 +326,68 @@ class EnvironmentSetupAgent:
                         export PATH=$PATH:/opt/gradle/gradle-8.3/bin
                     """,
                     "verification": "gradle -version",
+                    "which": ["gradle"],
                 },
                 "python3": {
-                    "installation": "sudo apt-get update && sudo apt-get install -y python3 python3-pip",
+                    "apt": ["python3", "python3-pip"],
                     "verification": "python3 --version && pip3 --version",
+                    "which": ["python3", "pip3"],
                 },
                 "mongodb": {
+                    "apt_sources": {
+                        "commands": [
+                            "wget -qO - https://www.mongodb.org/static/pgp/server-6.0.asc | sudo apt-key add -",
+                            'echo "deb [ arch=amd64,arm64 ] https://repo.mongodb.org/apt/ubuntu $(lsb_release -cs)/mongodb-org/6.0 multiverse" | sudo tee /etc/apt/sources.list.d/mongodb-org-6.0.list',
+                        ],
+                    },
+                    "apt": ["mongodb-org"],
                     "installation": """
-                        wget -qO - https://www.mongodb.org/static/pgp/server-6.0.asc | sudo apt-key add -
-                        echo "deb [ arch=amd64,arm64 ] https://repo.mongodb.org/apt/ubuntu $(lsb_release -cs)/mongodb-org/6.0 multiverse" | sudo tee /etc/apt/sources.list.d/mongodb-org-6.0.list
-                        sudo apt-get update
-                        sudo apt-get install -y mongodb-org
                         sudo systemctl start mongod
                         sudo systemctl enable mongod
                     """,
                     "verification": "mongod --version",
+                    "which": ["mongod"],
                 },
                 "postgresql": {
+                    "apt": ["postgresql", "postgresql-contrib"],
                     "installation": """
-                        sudo apt-get update
-                        sudo apt-get install -y postgresql postgresql-contrib
                         sudo systemctl start postgresql
                         sudo systemctl enable postgresql
                     """,
                     "verification": "psql --version",
+                    "which": ["psql"],
                 },
                 "mysql": {
+                    "apt": ["mysql-server"],
                     "installation": """
-                        sudo apt-get update
-                        sudo apt-get install -y mysql-server
                         sudo systemctl start mysql
                         sudo systemctl enable mysql
                         sudo mysql_secure_installation
                     """,
                     "verification": "mysql --version",
+                    "which": ["mysql"],
                 },
                 "redis": {
+                    "apt": ["redis-server"],
                     "installation": """
-                        sudo apt-get update
-                        sudo apt-get install -y redis-server
                         sudo systemctl start redis
                         sudo systemctl enable redis
                     """,
                     "verification": "redis-cli --version",
+                    "which": ["redis-cli"],
                 },
                 "vscode": {
-                    "installation": """
-                        wget -qO- https://packages.microsoft.com/keys/microsoft.asc | gpg --dearmor > packages.microsoft.gpg
-                        sudo install -D -o root -g root -m 644 packages.microsoft.gpg /etc/apt/keyrings/packages.microsoft.gpg
-                        sudo sh -c 'echo "deb [arch=amd64,arm64,armhf signed-by=/etc/apt/keyrings/packages.microsoft.gpg] https://packages.microsoft.com/repos/code stable main" > /etc/apt/sources.list.d/vscode.list'
-                        rm -f packages.microsoft.gpg
-                        sudo apt update
-                        sudo apt install -y code
-                    """,
+                    "apt_sources": {
+                        "commands": [
+                            "wget -qO- https://packages.microsoft.com/keys/microsoft.asc | gpg --dearmor > packages.microsoft.gpg",
+                            "sudo install -D -o root -g root -m 644 packages.microsoft.gpg /etc/apt/keyrings/packages.microsoft.gpg",
+                            """sudo sh -c 'echo "deb [arch=amd64,arm64,armhf signed-by=/etc/apt/keyrings/packages.microsoft.gpg] https://packages.microsoft.com/repos/code stable main" > /etc/apt/sources.list.d/vscode.list'""",
+                            "rm -f packages.microsoft.gpg",
+                        ],
+                    },
+                    "apt": ["code"],
                     "verification": "code --version",
+                    "which": ["code"],
                 },
                 "intellij-idea": {
                     "installation": """
@@ -155,30 +397,127 @@ class EnvironmentSetupAgent:
                 }
             }
         }
+        # Every known tool, ordered so that dependencies come before the tools needing them
+        self._install_order = self._resolve_install_order()
+    
+    def _resolve_install_order(self) -> List[str]:
+        """
+        Topologically sort the known tools along their dependency edges.
+        
+        Returns:
+            Tool names, each listed after all of its dependencies
+        """
+        order = []
+        visited = set()
+        
+        def visit(tool_name):
+            if tool_name in visited:
+                return
+            visited.add(tool_name)
+            for dependency in self.tools_cache["general"][tool_name].get("dependencies", []):
+                visit(dependency)
+            order.append(tool_name)
+        
+        for tool_name in self.tools_cache["general"]:
+            visit(tool_name)
+        return order
+    
+    def enable_http_cache(self, cache_name: str = "~/.envagent_cache"):
+        """
+        Persist GitHub API responses on disk and revalidate them with conditional requests.
+        
+        Cached responses are revalidated using their ETag / Last-Modified headers, so
+        unchanged repository and README blob lookups come back as 304s that don't
+        count against the rate limit.
+        
+        Args:
+            cache_name: Path of the SQLite cache file (without extension)
+        """
+        try:
+            import requests_cache
+        except ImportError:
+            # Caching is an optimization only; run uncached if the package is missing
+            return
         
+        # PyGithub opens its own requests sessions, so patch requests globally
+        requests_cache.install_cache(
+            os.path.expanduser(cache_name),
+            backend="sqlite",
+            cache_control=True,
+        )
+    
     def discover_projects(self):
         """
         Scan the repository to find all projects (assumed to be directories containing a README.md file).
         """
-        contents = self.repo.get_contents("")
+        # One GraphQL query lists the root-level directories, a second returns the
+        # README.md of each of them, however many directories there are
+        owner, name = self.repo.full_name.split("/")
+        variables = {"owner": owner, "name": name}
+        root = self._graphql(_ROOT_ENTRIES_QUERY, variables)["repository"]["object"] or {}
+        directories = [entry["name"] for entry in root.get("entries", []) if entry["type"] == "tree"]
+        
         self.projects = []
+        if not directories:
+            return self.projects
+        
+        paths = {f"p{index}": f"HEAD:{directory}/README.md" for index, directory in enumerate(directories)}
+        readmes = self._graphql(_readmes_query(len(directories)), {**variables, **paths})["repository"]
         
-        # Process all directories at the root level
-        for content in contents:
-            if content.type == "dir":
-                try:
-                    readme = self.repo.get_contents(f"{content.path}/README.md")
-                    self.projects.append({
-                        "name": content.name,
-                        "path": content.path,
-                        "readme_content": base64.b64decode(readme.content).decode('utf-8')
-                    })
-                except Exception:
-                    # Skip directories without a README.md
-                    continue
+        for index, directory in enumerate(directories):
+            readme = readmes[f"p{index}"]
+            # Missing paths come back as null, and non-blobs (directories, submodules) as {}
+            if not readme:
+                continue
+            # Binary or oversized blobs come back without (complete) text; fetch those lazily
+            text = None if readme["isTruncated"] else readme["text"]
+            self.projects.append(Project(directory, directory, readme["oid"], self._fetch_readme, text))
         
         return self.projects
     
+    def _graphql(self, query: str, variables: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Run a query against the GitHub GraphQL API.
+        
+        Args:
+            query: GraphQL query document
+            variables: Values for the query's variables
+            
+        Returns:
+            The "data" member of the response
+        """
+        import requests
+        
+        response = requests.post(
+            _GITHUB_GRAPHQL_URL,
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"bearer {self.github_token}"},
+            timeout=_GITHUB_TIMEOUT,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get("errors"):
+            raise RuntimeError("; ".join(error["message"] for error in payload["errors"]))
+        return payload["data"]
+    
+    def _fetch_readme(self, sha: str) -> Optional[str]:
+        """
+        Download and decode a README blob.
+        
+        Args:
+            sha: SHA of the README.md blob
+            
+        Returns:
+            Decoded content of the README.md file, or None if it couldn't be read
+        """
+        try:
+            readme = self.repo.get_git_blob(sha)
+            return base64.b64decode(readme.content).decode('utf-8')
+        except Exception as e:
+            # Report an unreadable README rather than ending the session
+            print(f"Error reading README blob {sha}: {e}")
+            return None
+    
     def parse_readme(self, readme_content: str) -> Dict[str, Any]:
         """
         Parse a README.md file to extract setup instructions and required tools.
@@ -189,8 +528,7 @@ class EnvironmentSetupAgent:
         Returns:
             Dictionary containing extracted setup information
         """
-        html = markdown.markdown(readme_content)
-        soup = BeautifulSoup(html, 'html.parser')
+        tokens = _markdown_parser().parse(readme_content)
         
         # Extract information from the README
         setup_info = {
@@ -201,75 +539,19 @@ class EnvironmentSetupAgent:
             "ide_setup": []
         }
         
-        # Look for prerequisites and required tools
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4']):
-            heading_text = heading.text.lower()
-            
-            if any(term in heading_text for term in ["prerequisite", "requirement", "depend", "tool", "software"]):
-                # Get all content until the next heading
-                content = []
-                for sibling in heading.next_siblings:
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                        break
-                    if sibling.name == 'ul':
-                        for li in sibling.find_all('li'):
-                            content.append(li.text.strip())
-                    elif sibling.name == 'p':
-                        content.append(sibling.text.strip())
-                
-                setup_info["prerequisites"].extend(content)
-            
-            elif any(term in heading_text for term in ["setup", "install", "configur", "environ"]):
-                content = []
-                for sibling in heading.next_siblings:
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                        break
-                    if sibling.name in ['p', 'pre', 'code']:
-                        content.append(sibling.text.strip())
-                    elif sibling.name == 'ul':
-                        for li in sibling.find_all('li'):
-                            content.append(li.text.strip())
-                
-                setup_info["environment_setup"].extend(content)
-            
-            elif any(term in heading_text for term in ["database", "db", "data"]):
-                content = []
-                for sibling in heading.next_siblings:
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                        break
-                    if sibling.name in ['p', 'pre', 'code']:
-                        content.append(sibling.text.strip())
-                    elif sibling.name == 'ul':
-                        for li in sibling.find_all('li'):
-                            content.append(li.text.strip())
-                
-                setup_info["database_setup"].extend(content)
-            
-            elif any(term in heading_text for term in ["run", "start", "execute"]):
-                content = []
-                for sibling in heading.next_siblings:
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                        break
-                    if sibling.name in ['p', 'pre', 'code']:
-                        content.append(sibling.text.strip())
-                    elif sibling.name == 'ul':
-                        for li in sibling.find_all('li'):
-                            content.append(li.text.strip())
-                
-                setup_info["running_instructions"].extend(content)
-            
-            elif any(term in heading_text for term in ["ide", "intellij", "eclipse", "vscode", "editor"]):
-                content = []
-                for sibling in heading.next_siblings:
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
-                        break
-                    if sibling.name in ['p', 'pre', 'code']:
-                        content.append(sibling.text.strip())
-                    elif sibling.name == 'ul':
-                        for li in sibling.find_all('li'):
-                            content.append(li.text.strip())
-                
-                setup_info["ide_setup"].extend(content)
+        # Walk the top-level blocks once, routing content to the bucket
+        # selected by the most recent heading
+        bucket = None
+        for index, token in enumerate(tokens):
+            if token.level != 0:
+                continue
+            if token.type == "heading_open" and token.tag in _HEADING_TAGS:
+                heading_text = _inline_text(tokens[index + 1]).lower()
+                bucket = next((b for keyword, b in _HEADING_KEYWORDS if keyword in heading_text), None)
+                continue
+            action = _SECTION_ACTIONS[bucket].get(token.type) if bucket else None
+            if action:
+                setup_info[bucket].extend(action(tokens, index))
         
         # Analyze the README to detect required tools
         setup_info["detected_tools"] = self.detect_tools(readme_content)
@@ -286,31 +568,7 @@ class EnvironmentSetupAgent:
         Returns:
             List of detected tools
         """
-        tools = []
-        # Keywords to look for various tools and technologies
-        tool_patterns = {
-            "java": r"\bjava\b|\bjdk\b|\bjre\b",
-            "maven": r"\bmaven\b|\bmvn\b",
-            "gradle": r"\bgradle\b",
-            "node": r"\bnode(?:js)?\b",
-            "npm": r"\bnpm\b",
-            "python3": r"\bpython(?:3)?\b|\bpip(?:3)?\b",
-            "docker": r"\bdocker\b",
-            "docker-compose": r"\bdocker[ -]compose\b",
-            "git": r"\bgit\b",
-            "mongodb": r"\bmongo(?:db)?\b",
-            "postgresql": r"\bpostgre(?:s|sql)?\b",
-            "mysql": r"\bmysql\b",
-            "redis": r"\bredis\b",
-            "vscode": r"\bvs ?code\b|\bvisual studio code\b",
-            "intellij-idea": r"\bintellij\b|\bidea\b"
-        }
-        
-        for tool, pattern in tool_patterns.items():
-            if re.search(pattern, readme_content, re.IGNORECASE):
-                tools.append(tool)
-        
-        return tools
+        return list(_detect_tools(readme_content))
     
     def analyze_all_projects(self):
         """
@@ -319,17 +577,33 @@ class EnvironmentSetupAgent:
         Returns:
             Dictionary mapping project names to their setup information
         """
-        project_info = {}
-        
-        for project in self.projects:
-            project_info[project["name"]] = self.parse_readme(project["readme_content"])
+        return {project.name: self.get_setup_info(project) for project in self.projects}
+    
+    def get_setup_info(self, project: Project) -> Dict[str, Any]:
+        """
+        Get the parsed setup information for a project, parsing its README only once.
         
-        return project_info
+        Args:
+            project: Project entry from discover_projects
+            
+        Returns:
+            Dictionary containing extracted setup information
+        """
+        if project.readme_sha not in self._parse_cache:
+            readme_content = project.readme_content
+            if readme_content is None:
+                # Don't cache a failed fetch, so the README is retried on the next call
+                return self.parse_readme("")
+            self._parse_cache[project.readme_sha] = self.parse_readme(readme_content)
+        return self._parse_cache[project.readme_sha]
     
     def check_tool_installed(self, tool_name: str) -> bool:
         """
         Check if a specific tool is already installed on the system.
         
+        Results are cached for the session, so each tool is verified at most once
+        unless it gets (re)installed.
+        
         Args:
             tool_name: Name of the tool to check
             
@@ -340,20 +614,162 @@ class EnvironmentSetupAgent:
             print(f"Unknown tool: {tool_name}")
             return False
         
+        if tool_name in self._installed_cache:
+            return self._installed_cache[tool_name]
+        
+        if self._found_on_path(tool_name):
+            self._installed_cache[tool_name] = True
+            return True
+        
         verification_cmd = self.tools_cache["general"][tool_name]["verification"]
         try:
             result = subprocess.run(verification_cmd, shell=True, capture_output=True, text=True)
-            return result.returncode == 0
+            self._installed_cache[tool_name] = result.returncode == 0
+            return self._installed_cache[tool_name]
         except Exception as e:
             print(f"Error checking tool {tool_name}: {e}")
             return False
     
-    def install_tool(self, tool_name: str) -> bool:
+    def _found_on_path(self, tool_name: str) -> bool:
+        """
+        Check whether all of a tool's executables are on PATH, without spawning a process.
+        
+        Args:
+            tool_name: Name of the tool to check
+            
+        Returns:
+            True if the tool lists its executables and all of them were found, False otherwise
+        """
+        executables = self.tools_cache["general"][tool_name].get("which")
+        return bool(executables) and all(shutil.which(executable) for executable in executables)
+    
+    def check_tools_installed(self, tool_names: List[str]) -> Dict[str, bool]:
+        """
+        Check several tools at once using a single shell invocation.
+        
+        Tools already verified during this session are answered from the cache, and tools
+        whose executables are on PATH need no verification command at all.
+        
+        Args:
+            tool_names: Names of the tools to check
+            
+        Returns:
+            Dictionary mapping each tool name to True if installed, False otherwise
+        """
+        status = {}
+        pending = []
+        for tool_name in tool_names:
+            if tool_name not in self.tools_cache["general"]:
+                print(f"Unknown tool: {tool_name}")
+                status[tool_name] = False
+            elif tool_name in self._installed_cache:
+                status[tool_name] = self._installed_cache[tool_name]
+            elif self._found_on_path(tool_name):
+                self._installed_cache[tool_name] = True
+                status[tool_name] = True
+            else:
+                pending.append(tool_name)
+        
+        if not pending:
+            return status
+        
+        # One status line per tool, e.g. "git OK" or "docker MISSING"
+        script = "\n".join(
+            f'if {{ {self.tools_cache["general"][tool_name]["verification"]}; }} >/dev/null 2>&1; '
+            f'then echo "{tool_name} OK"; else echo "{tool_name} MISSING"; fi'
+            for tool_name in pending
+        )
+        try:
+            result = subprocess.run(script, shell=True, capture_output=True, text=True)
+        except Exception as e:
+            print(f"Error checking tools {', '.join(pending)}: {e}")
+            status.update((tool_name, False) for tool_name in pending)
+            return status
+        
+        for line in result.stdout.splitlines():
+            tool_name, _, outcome = line.rpartition(" ")
+            if tool_name in pending:
+                self._installed_cache[tool_name] = outcome == "OK"
+        
+        for tool_name in pending:
+            status[tool_name] = self._installed_cache.get(tool_name, False)
+        
+        return status
+    
+    def _run_install_command(self, command) -> bool:
+        """
+        Run a single installation command, streaming its output as it is produced.
+        
+        Only the last few lines of output are kept, to recap them if the command fails.
+        
+        Args:
+            command: Shell script string, or argv list run without a shell
+            
+        Returns:
+            True if the command succeeded, False otherwise
+        """
+        tail = deque(maxlen=20)
+        process = subprocess.Popen(
+            command,
+            shell=isinstance(command, str),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        for line in process.stdout:
+            print(line, end="")
+            tail.append(line)
+        
+        returncode = process.wait()
+        if returncode != 0:
+            print(f"Installation failed (exit code {returncode}). Last output:\n{''.join(tail)}")
+            return False
+        return True
+    
+    def _install_apt_packages(self, tool_names: List[str]) -> bool:
+        """
+        Install the apt packages of several tools with a single apt-get update and install.
+        
+        Args:
+            tool_names: Names of the tools whose apt packages should be installed
+            
+        Returns:
+            True if all packages were installed, False otherwise
+        """
+        tools = [self.tools_cache["general"][tool_name] for tool_name in tool_names]
+        sources = [tool["apt_sources"] for tool in tools if "apt_sources" in tool]
+        packages = list(dict.fromkeys(package for tool in tools for package in tool["apt"]))
+        
+        print(f"Installing apt packages for {', '.join(tool_names)}...")
+        if sources:
+            # Adding third-party repositories needs a few packages of its own
+            required = list(dict.fromkeys(package for source in sources for package in source.get("requires", [])))
+            if required and not (
+                self._run_install_command(["sudo", "apt-get", "update"])
+                and self._run_install_command(["sudo", "apt-get", "install", "-y", *required])
+            ):
+                return False
+            for source in sources:
+                for command in source["commands"]:
+                    if not self._run_install_command(command):
+                        return False
+        
+        return (
+            self._run_install_command(["sudo", "apt-get", "update"])
+            and self._run_install_command(["sudo", "apt-get", "install", "-y", *packages])
+        )
+    
+    def install_tool(self, tool_name: str, skip_apt: bool = False) -> bool:
         """
         Install a specific tool on the system.
         
+        Dependencies are not installed here; use install_tools to install a tool
+        together with whatever it depends on.
+        
         Args:
             tool_name: Name of the tool to install
+            skip_apt: True if the tool's apt packages were already installed in a batch
             
         Returns:
             True if installation was successful, False otherwise
@@ -362,30 +778,93 @@ class EnvironmentSetupAgent:
             print(f"Unknown tool: {tool_name}")
             return False
         
-        # Check if there are any dependencies
         tool_info = self.tools_cache["general"][tool_name]
-        if "dependencies" in tool_info:
-            for dependency in tool_info["dependencies"]:
-                if not self.check_tool_installed(dependency):
-                    print(f"Installing dependency: {dependency}")
-                    if not self.install_tool(dependency):
-                        print(f"Failed to install dependency: {dependency}")
-                        return False
-        
-        installation_cmd = tool_info["installation"]
+        installation_cmd = tool_info.get("installation", "")
         try:
             print(f"Installing {tool_name}...")
-            result = subprocess.run(installation_cmd, shell=True, capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"Installation failed: {result.stderr}")
+            if "apt" in tool_info and not skip_apt and not self._install_apt_packages([tool_name]):
+                return False
+            if installation_cmd.strip() and not self._run_install_command(installation_cmd):
                 return False
             
-            # Verify installation
+            # Verify installation, bypassing the status cached before installing
+            self._installed_cache.pop(tool_name, None)
             return self.check_tool_installed(tool_name)
         except Exception as e:
             print(f"Error installing tool {tool_name}: {e}")
             return False
     
+    def install_tools(self, tool_names: List[str]) -> Dict[str, bool]:
+        """
+        Install tools along with their missing dependencies, each at most once.
+        
+        Args:
+            tool_names: Names of the tools to install
+            
+        Returns:
+            Dictionary mapping every tool an installation was attempted for
+            (dependencies included) to True if it succeeded, False otherwise
+        """
+        results = {}
+        pending = []
+        for tool_name in dict.fromkeys(tool_names):
+            if tool_name in self.tools_cache["general"]:
+                pending.append(tool_name)
+            else:
+                print(f"Unknown tool: {tool_name}")
+                results[tool_name] = False
+        
+        # Only tools that are actually missing pull in their dependencies, which are
+        # checked in turn, so installed tools never trigger dependency installs
+        installed = {}
+        needed = set()
+        while pending:
+            installed.update(self.check_tools_installed(pending))
+            missing = [tool_name for tool_name in pending if not installed[tool_name]]
+            needed.update(missing)
+            pending = list(dict.fromkeys(
+                dependency
+                for tool_name in missing
+                for dependency in self.tools_cache["general"][tool_name].get("dependencies", [])
+                if dependency not in installed
+            ))
+        
+        # Apt packages of missing tools without dependencies share one apt-get update and install
+        batched = [
+            tool_name for tool_name in self._install_order
+            if tool_name in needed and not installed[tool_name]
+            and "apt" in self.tools_cache["general"][tool_name]
+            and not self.tools_cache["general"][tool_name].get("dependencies")
+        ]
+        try:
+            batch_installed = not batched or self._install_apt_packages(batched)
+        except Exception as e:
+            print(f"Error installing apt packages: {e}")
+            batch_installed = False
+        
+        for tool_name in self._install_order:
+            if tool_name not in needed or installed[tool_name]:
+                continue
+            
+            if tool_name in batched:
+                # If the shared apt run failed, install each tool on its own so that one
+                # bad package or repository doesn't fail every unrelated tool
+                success = self.install_tool(tool_name, skip_apt=batch_installed)
+                installed[tool_name] = results[tool_name] = success
+                continue
+            
+            missing = [d for d in self.tools_cache["general"][tool_name].get("dependencies", []) if not installed[d]]
+            if missing:
+                print(f"Skipping {tool_name}: missing dependencies {', '.join(missing)}")
+                installed[tool_name] = results[tool_name] = False
+                continue
+            
+            if tool_name not in tool_names:
+                print(f"Installing dependency: {tool_name}")
+            installed[tool_name] = results[tool_name] = self.install_tool(tool_name)
+        
+        return results
+    
     def setup_environment_for_project(self, project_name: str):
         """
         Set up the environment for a specific project.
@@ -396,21 +875,19 @@ class EnvironmentSetupAgent:
         if not self.projects:
             self.discover_projects()
         
-        project = next((p for p in self.projects if p["name"] == project_name), None)
+        project = next((p for p in self.projects if p.name == project_name), None)
         if not project:
             print(f"Project {project_name} not found")
             return
         
-        setup_info = self.parse_readme(project["readme_content"])
+        setup_info = self.get_setup_info(project)
         
-        # Install detected tools
-        for tool in setup_info["detected_tools"]:
-            if not self.check_tool_installed(tool):
-                print(f"Tool {tool} is required but not installed. Installing...")
-                if self.install_tool(tool):
-                    print(f"Successfully installed {tool}")
-                else:
-                    print(f"Failed to install {tool}")
+        # Install detected tools that are missing, dependencies first
+        for tool, success in self.install_tools(setup_info["detected_tools"]).items():
+            if success:
+                print(f"Successfully installed {tool}")
+            else:
+                print(f"Failed to install {tool}")
         
         # Display setup instructions
         print("\n" + "="*50)
@@ -446,13 +923,15 @@ class EnvironmentSetupAgent:
         Returns:
             Name of the selected project
         """
+        import inquirer
+        
         if not self.projects:
             self.discover_projects()
         
         questions = [
             inquirer.List('project',
                           message="Select a project to set up:",
-                          choices=[p["name"] for p in self.projects],
+                          choices=[p.name for p in self.projects],
                          )
         ]
         answers = inquirer.prompt(questions)
@@ -460,6 +939,8 @@ class EnvironmentSetupAgent:
     
     def run_interactive(self):
         """Run the agent in interactive mode."""
+        import inquirer
+        
         print("🤖 Welcome to the Environment Setup Agent! 🚀")
         print("Discovering projects in the repository...")
         
@@ -497,31 +978,33 @@ class EnvironmentSetupAgent:
                 answers = inquirer.prompt(questions)
                 tool = answers['tool']
                 if not self.check_tool_installed(tool):
-                    if self.install_tool(tool):
-                        print(f"Successfully installed {tool}")
-                    else:
-                        print(f"Failed to install {tool}")
+                    for installed_tool, success in self.install_tools([tool]).items():
+                        if success:
+                            print(f"Successfully installed {installed_tool}")
+                        else:
+                            print(f"Failed to install {installed_tool}")
                 else:
                     print(f"{tool} is already installed")
             
             elif answers['action'] == "List available projects":
                 print("\nAvailable projects:")
                 for i, project in enumerate(self.projects, 1):
-                    print(f"{i}. {project['name']}")
+                    print(f"{i}. {project.name}")
             
             elif answers['action'] == "List recommended tools":
                 all_projects_info = self.analyze_all_projects()
-                tool_frequency = {}
+                tool_frequency = Counter(
+                    tool for info in all_projects_info.values() for tool in info["detected_tools"]
+                )
                 
-                for project, info in all_projects_info.items():
-                    for tool in info["detected_tools"]:
-                        tool_frequency[tool] = tool_frequency.get(tool, 0) + 1
+                status = self.check_tools_installed(list(tool_frequency))
+                installed = {tool for tool, is_installed in status.items() if is_installed}
                 
                 print("\nRecommended tools based on project requirements:")
-                for tool, count in sorted(tool_frequency.items(), key=lambda x: x[1], reverse=True):
+                for tool, count in tool_frequency.most_common():
                     percentage = (count / len(self.projects)) * 100
                     print(f"- {tool}: used in {count}/{len(self.projects)} projects ({percentage:.1f}%)")
-                    if not self.check_tool_installed(tool):
+                    if tool not in installed:
                         print(f"  ❌ Not installed. Run 'Install a specific tool' to install it.")
                     else:
                         print(f"  ✅ Already installed")
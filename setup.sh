@@ -22,7 +22,7 @@ source env/bin/activate
 
 # Install required packages
 echo "Installing required packages..."
-pip install PyGithub markdown beautifulsoup4 inquirer
+pip install PyGithub requests-cache markdown-it-py inquirer
 
 # Download the environment setup agent
 echo "Setting up the agent..."